@@ -2,27 +2,48 @@
 Agent factory for creating different types of agents.
 Provides a centralized way to create and manage agent instances.
 """
-from typing import Dict, Type
-from agent.base_agent import BaseAgent
-from agent.conversation_agent import ConversationAgent
-from agent.code_agent import CodeAgent
+import importlib
+from functools import lru_cache
+from typing import Dict, Tuple, Type, TYPE_CHECKING
 from utils.logger import get_logger
 
+if TYPE_CHECKING:
+    from agent.base_agent import BaseAgent
+    from agent.conversation_agent import ConversationAgent
+
 logger = get_logger(__name__)
 
 
 class AgentFactory:
     """Factory class for creating different types of agents."""
     
-    # Registry of available agent types
-    _agent_types: Dict[str, Type[BaseAgent]] = {
-        'conversation': ConversationAgent,
-        'code': CodeAgent
+    # Registry of available agent types as "module:ClassName" import paths,
+    # so agent modules (and LangChain/LangGraph) load only when first needed
+    _agent_types: Dict[str, str] = {
+        'conversation': 'agent.conversation_agent:ConversationAgent',
+        'code': 'agent.code_agent:CodeAgent'
         # Add more agent types here as they are created
     }
     
+    # Agent classes imported so far
+    _resolved_classes: Dict[str, Type['BaseAgent']] = {}
+    
+    # The registry is static, so its views are built once at class creation
+    _available_types: Tuple[str, ...] = tuple(_agent_types.keys())
+    _agent_types_set = frozenset(_agent_types)
+    
     @classmethod
-    def create_agent(cls, agent_type: str, config_path: str, **kwargs) -> BaseAgent:
+    def _resolve_agent_class(cls, agent_type: str) -> Type['BaseAgent']:
+        """Import and cache the agent class registered for agent_type."""
+        agent_class = cls._resolved_classes.get(agent_type)
+        if agent_class is None:
+            module_path, class_name = cls._agent_types[agent_type].split(':')
+            agent_class = getattr(importlib.import_module(module_path), class_name)
+            cls._resolved_classes[agent_type] = agent_class
+        return agent_class
+    
+    @classmethod
+    def create_agent(cls, agent_type: str, config_path: str, **kwargs) -> 'BaseAgent':
         """
         Create an agent of the specified type.
         
@@ -37,11 +58,11 @@ class AgentFactory:
         Raises:
             ValueError: If agent_type is not supported
         """
-        if agent_type not in cls._agent_types:
-            available_types = list(cls._agent_types.keys())
+        if agent_type not in cls._agent_types_set:
+            available_types = list(cls._available_types)
             raise ValueError(f"Unsupported agent type: {agent_type}. Available types: {available_types}")
         
-        agent_class = cls._agent_types[agent_type]
+        agent_class = cls._resolve_agent_class(agent_type)
         logger.info(f"Creating {agent_type} agent with config: {config_path}")
         
         try:
@@ -54,14 +75,16 @@ class AgentFactory:
             raise
     
     @classmethod
-    def get_available_agent_types(cls) -> list:
-        """Get list of available agent types."""
-        return list(cls._agent_types.keys())
+    def get_available_agent_types(cls) -> Tuple[str, ...]:
+        """Get the available agent types."""
+        return cls._available_types
     
-    @classmethod
-    def get_agent_info(cls, agent_type: str) -> Dict[str, str]:
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def get_agent_info(agent_type: str) -> Dict[str, str]:
         """
         Get information about a specific agent type.
+        The result is cached; callers must not mutate it.
         
         Args:
             agent_type: Type of agent to get info for
@@ -69,10 +92,10 @@ class AgentFactory:
         Returns:
             Dictionary with agent information
         """
-        if agent_type not in cls._agent_types:
+        if agent_type not in AgentFactory._agent_types_set:
             return {}
         
-        agent_class = cls._agent_types[agent_type]
+        agent_class = AgentFactory._resolve_agent_class(agent_type)
         return {
             'name': agent_type,
             'class_name': agent_class.__name__,
@@ -82,7 +105,7 @@ class AgentFactory:
 
 
 # Convenience function for backward compatibility
-def create_conversation_agent(config_path: str) -> ConversationAgent:
+def create_conversation_agent(config_path: str) -> 'ConversationAgent':
     """
     Create a conversation agent (backward compatibility function).
     
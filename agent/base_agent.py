@@ -3,17 +3,17 @@ Base agent classes for creating extensible agent architectures.
 Provides the foundation for building different types of agents with shared functionality.
 """
 import asyncio
+import logging
+import secrets
+import weakref
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, AsyncGenerator, Optional
+from functools import lru_cache, partial
+from typing import Dict, Any, List, AsyncGenerator, Awaitable, Callable, Optional, Sequence, Tuple
 from uuid import uuid4
 
-from langchain.schema import BaseMessage, HumanMessage, AIMessage
-from langchain_core.messages import ToolMessage
-from langchain.schema.language_model import BaseLanguageModel
+from langchain.schema import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.messages import AIMessageChunk, ToolMessage
 from langchain.tools import BaseTool
-from langgraph.graph import StateGraph, END
-from langgraph.graph.message import MessageGraph
-from langgraph.prebuilt import ToolNode
 
 from agent.models.loader import ModelLoader
 from agent.memory import MemoryManager
@@ -23,10 +23,88 @@ from utils.logger import setup_logger
 
 logger = setup_logger(__name__, "DEBUG")  # 明确设置为DEBUG级别并初始化
 
+# Stream event types that chat_stream forwards to the caller
+_FORWARDED_CHUNK_TYPES = frozenset({
+    "message", "tool_call", "tool_result", "tool_detected",
+    # Tool confirmation related events
+    "tool_confirmation_required", "tool_confirmation_timeout",
+    "tool_confirmation_rejected", "tool_execution_start", "tool_error"
+})
+
+# Confirmation events after which the user is no longer being asked
+_CONFIRMATION_ANSWERED_EVENTS = frozenset({
+    "tool_execution_start", "tool_confirmation_timeout", "tool_confirmation_rejected"
+})
+
+
+class _IdentityCache:
+    """
+    Small FIFO cache for objects built from other objects (an llm, tools).
+    
+    Entries are keyed by the ids of those objects, which are stored with the
+    entry so their ids cannot be reused while it exists, and checked with
+    ``is`` on lookup.
+    """
+    
+    def __init__(self, size: int = 8):
+        self.size = size
+        self._entries: Dict[Tuple[int, ...], Tuple[Tuple[Any, ...], Any]] = {}
+    
+    def get_or_build(self, objects: Sequence[Any], build: Callable[[], Any]) -> Any:
+        """Return the value built from these exact objects, building it on first use."""
+        key = tuple(id(obj) for obj in objects)
+        cached = self._entries.get(key)
+        if cached is not None and all(a is b for a, b in zip(cached[0], objects)):
+            return cached[1]
+        
+        value = build()
+        if len(self._entries) >= self.size:
+            # Drop the oldest entry
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[key] = (tuple(objects), value)
+        return value
+
+
+@lru_cache(maxsize=256)
+def _schema_to_dict(schema) -> Dict[str, Dict[str, Any]]:
+    """
+    Reflect a tool args schema into a plain dict, cached per schema class
+    so agents sharing tools share the result. Callers must not mutate it;
+    it stays a plain dict because it is JSON-serialized into stream events.
+    """
+    if hasattr(schema, 'model_fields'):
+        # Pydantic v2
+        return {
+            field_name: {
+                'type': str(field_info.annotation),
+                'description': field_info.description or '',
+                'required': field_info.is_required()
+            }
+            for field_name, field_info in schema.model_fields.items()
+        }
+    if hasattr(schema, '__fields__'):
+        # Pydantic v1
+        return {
+            field_name: {
+                'type': str(field_info.type_),
+                'description': field_info.field_info.description or '',
+                'required': field_info.required
+            }
+            for field_name, field_info in schema.__fields__.items()
+        }
+    return {}
+
 
 class BaseAgent(ABC):
     """Base class for all agents with shared functionality."""
     
+    # Model loaders shared by agents created from the same config file
+    _model_loaders: "weakref.WeakValueDictionary[str, ModelLoader]" = weakref.WeakValueDictionary()
+    
+    # Tool bindings per (llm, tools) and ToolNodes per tools, shared across agents
+    _bound_llms = _IdentityCache()
+    _tool_nodes = _IdentityCache()
+    
     def __init__(self, config_path: str, streaming_config: Dict[str, Any] = None):
         """
         Initialize the base agent.
@@ -36,7 +114,7 @@ class BaseAgent(ABC):
             streaming_config: Configuration for streaming behavior
         """
         self.config_path = config_path
-        self.model_loader = ModelLoader(config_path)
+        self.model_loader = self._get_model_loader(config_path)
         self.llm = self.model_loader.load_llm()
         
         # Initialize database and memory
@@ -58,18 +136,104 @@ class BaseAgent(ABC):
         # Initialize specific agent implementation
         self._initialize_agent()
         
+        # Tools are fixed after initialization, so index them once by name
+        self._tool_invokers: Dict[str, Callable[[Dict[str, Any]], Awaitable[Any]]] = {
+            tool.name: self._build_tool_invoker(tool) for tool in self.tools
+        }
+        self._tool_info_cache: Dict[str, Dict[str, Any]] = {
+            tool.name: self._build_tool_info(tool) for tool in self.tools
+        }
+        self._tool_name_list_str = str([tool.name for tool in self.tools])
+        
+        # Bind per-turn methods once instead of resolving them on every request
+        self._graph_astream = self.graph.astream
+        self._request_confirmation = self.confirmation_manager.request_confirmation
+        
         logger.info(f"{self.__class__.__name__} initialized successfully")
+        logger.info(f"Streaming config: {self.streaming_config}")
         if self.tools:
-            logger.info(f"Loaded {len(self.tools)} tools: {[tool.name for tool in self.tools]}")
+            logger.info(f"Loaded {len(self.tools)} tools: {self._tool_name_list_str}")
+    
+    def _new_session_id(self) -> str:
+        """Mint a session id; uuid4 only when ``strict_session_ids`` asks for RFC 4122 ids."""
+        if self.streaming_config.get("strict_session_ids", False):
+            return str(uuid4())
+        # 会话ID同时作为访问凭证，保持使用CSPRNG
+        return secrets.token_hex(12)
+    
+    def _bind_tools(self, tools: List[BaseTool]):
+        """Bind tools to self.llm, reusing the binding made for the same llm and tool set."""
+        llm = self.llm
+        return BaseAgent._bound_llms.get_or_build((llm, *tools), lambda: llm.bind_tools(tools))
+    
+    def _get_tool_node(self, tools: List[BaseTool]):
+        """Get a ToolNode for these tool objects, reusing the one built for an earlier agent."""
+        from langgraph.prebuilt import ToolNode
+        
+        return BaseAgent._tool_nodes.get_or_build(tools, lambda: ToolNode(tools))
+    
+    @staticmethod
+    def _evict_history(messages: List[BaseMessage], keep_turns: int = 5,
+                       keep_reasoning: int = 3) -> List[BaseMessage]:
+        """
+        Shrink older parts of the history before it is sent to the model.
+        
+        System messages and the last ``keep_turns`` turns (a turn starts at a
+        human message) are kept verbatim. Older tool results collapse to a
+        one-line marker, and reasoning content is dropped from all but the
+        last ``keep_reasoning`` AI messages. Messages are copied, never mutated,
+        since they may be shared with the memory cache.
+        """
+        human_indexes = [i for i, msg in enumerate(messages) if isinstance(msg, HumanMessage)]
+        if len(human_indexes) > keep_turns:
+            recent_start = human_indexes[-keep_turns] if keep_turns > 0 else len(messages)
+        else:
+            recent_start = 0
+        ai_indexes = [i for i, msg in enumerate(messages) if isinstance(msg, AIMessage)]
+        reasoning_start = ai_indexes[-keep_reasoning] if len(ai_indexes) > keep_reasoning else 0
+        
+        evicted = []
+        for i, msg in enumerate(messages):
+            if i < recent_start and not isinstance(msg, SystemMessage):
+                if isinstance(msg, ToolMessage):
+                    msg = msg.model_copy(update={"content": "[tool result evicted]"})
+                elif isinstance(msg, AIMessage) and "tool_name" in msg.response_metadata:
+                    tool_name = msg.response_metadata["tool_name"]
+                    msg = msg.model_copy(update={"content": f"Tool: {tool_name} [tool result evicted]"})
+            if (i < reasoning_start and isinstance(msg, AIMessage)
+                    and "reasoning_content" in msg.additional_kwargs):
+                additional_kwargs = dict(msg.additional_kwargs)
+                del additional_kwargs["reasoning_content"]
+                msg = msg.model_copy(update={"additional_kwargs": additional_kwargs})
+            evicted.append(msg)
+        return evicted
+    
+    @classmethod
+    def _get_model_loader(cls, config_path: str) -> ModelLoader:
+        """Get the shared model loader for a config file, refreshing it if the file changed."""
+        loader = BaseAgent._model_loaders.get(config_path)
+        if loader is None:
+            loader = ModelLoader(config_path)
+            BaseAgent._model_loaders[config_path] = loader
+        else:
+            loader.reload_config()
+        return loader
     
     def _get_default_streaming_config(self) -> Dict[str, Any]:
         """Get default streaming configuration. Can be overridden by subclasses."""
         return {
             "require_tool_confirmation": True,  # 是否需要工具确认
             "auto_execute_tools": False,        # 是否自动执行工具
-            "stream_mode": "values",             # LangGraph stream mode
+            "stream_mode": "messages",           # LangGraph stream mode（messages为逐token输出）
             "process_tool_calls": True,          # 是否处理工具调用
-            "deduplicate_events": False          # 是否去重事件
+            "deduplicate_events": False,         # 是否去重事件
+            "strict_session_ids": False,         # 是否使用RFC 4122格式的会话ID
+            "coalesce_text": False,              # 是否合并文本为单条消息（非实时渲染的调用方）
+            "history_keep_turns": 5,             # 完整保留的最近轮数，None表示不裁剪历史
+            "graph_buffer_size": 32,             # 图输出的预取缓冲区大小，0表示不缓冲（需要工具确认时不缓冲）
+            "text_batch_chars": 32,              # 文本凑够多少字符发送一次，0表示逐token发送
+            "text_batch_ms": 16,                 # 文本最长攒多少毫秒后发送
+            "skip_tools_for_plain_chat": False   # 明显不需要工具的消息直接调用模型
         }
     
     @abstractmethod
@@ -87,6 +251,19 @@ class BaseAgent(ABC):
         """Build the LangGraph for this agent type. Must be implemented by subclasses."""
         pass
     
+    def _needs_tools(self, messages: List[BaseMessage]) -> bool:
+        """
+        Whether this turn may need a tool. Can be overridden by subclasses.
+        
+        Only consulted when ``skip_tools_for_plain_chat`` is set; returning False
+        streams the plain llm, without tool schemas in the prompt.
+        """
+        return True
+    
+    def _graph_input(self, messages: List[BaseMessage]) -> Any:
+        """Shape the messages into this agent's graph input. Can be overridden by subclasses."""
+        return messages
+    
     async def chat_stream(self, 
                          message: str, 
                          session_id: str = None) -> AsyncGenerator[Dict[str, Any], None]:
@@ -102,82 +279,90 @@ class BaseAgent(ABC):
             Stream of response chunks
         """
         if session_id is None:
-            session_id = str(uuid4())
+            session_id = self._new_session_id()
         
         logger.info(f"Processing message for session {session_id} with {self.__class__.__name__}")
         
+        # Messages of this turn, written to memory in one batch at the end.
+        # session_id is passed down explicitly, so keep it out of the message
+        # sent to the model; the same object is stored and reused by memory.
+        current_message = HumanMessage(content=message)
+        pending_writes = [current_message]
+        
+        # Load chat history in the background (may hit the DB and the LLM for
+        # compression) so session info reaches the client without waiting on it
+        history_task = asyncio.create_task(asyncio.to_thread(self.memory.get_chat_history, session_id))
+        write_task = None
+        response_stream = None
+        
         try:
-            # Add user message to memory
-            user_message = {
-                "type": "human",
-                "content": message,
-                "metadata": {}
-            }
-            self.memory.add_message(session_id, user_message)
-            
-            # Get chat history
-            history, was_compressed = self.memory.get_chat_history(session_id)
-            
-            # Add current message with session_id in additional_kwargs
-            current_message = HumanMessage(
-                content=message, 
-                additional_kwargs={"session_id": session_id}
-            )
-            current_messages = history + [current_message]
-            
             # Yield session info
             yield {
                 "type": "session_info",
                 "session_id": session_id,
-                "was_compressed": was_compressed,
                 "agent_type": self.__class__.__name__
             }
             
+            history, was_compressed = await history_task
+            if was_compressed:
+                yield {
+                    "type": "history_compressed",
+                    "session_id": session_id,
+                    "agent_type": self.__class__.__name__
+                }
+            
+            # get_chat_history builds a fresh list every call, so extend it in place
+            history.append(current_message)
+            current_messages = history
+            keep_turns = self.streaming_config.get("history_keep_turns", 5)
+            if keep_turns is not None:
+                current_messages = self._evict_history(current_messages, keep_turns)
+            
             # Process with the graph
-            response_content = ""
-            tool_calls_made = []
+            response_parts = []
+            tool_call_count = 0
+            tool_messages = []
+            
+            chunks = self._stream_graph_response(current_messages, session_id)
+            batch_chars = self.streaming_config.get("text_batch_chars", 32)
+            if batch_chars:
+                chunks = self._batch_text_chunks(chunks, batch_chars, self.streaming_config.get("text_batch_ms", 16))
+            
+            response_stream = chunks
             
-            async for chunk in self._stream_graph_response(current_messages):
-                if chunk["type"] == "message":
-                    response_content += chunk["content"]
-                    yield chunk
-                elif chunk["type"] == "tool_call":
-                    tool_calls_made.append(chunk)
-                    yield chunk
-                elif chunk["type"] == "tool_result":
-                    yield chunk
-                elif chunk["type"] == "tool_detected":
-                    # Forward tool detection events to frontend
-                    yield chunk
-                elif chunk["type"] in ["tool_confirmation_required", "tool_confirmation_timeout", 
-                                       "tool_confirmation_rejected", "tool_execution_start", "tool_error"]:
-                    # Forward all tool confirmation related events
-                    yield chunk
-            
-            # Save AI response to memory
+            async for chunk in chunks:
+                chunk_type = chunk["type"]
+                if chunk_type == "_memory_records":
+                    tool_messages = chunk["records"]
+                    continue
+                if chunk_type not in _FORWARDED_CHUNK_TYPES:
+                    continue
+                
+                # Forward the event to the frontend unchanged, then record it
+                yield chunk
+                if chunk_type == "message":
+                    response_parts.append(chunk["content"])
+                elif chunk_type == "tool_call":
+                    tool_call_count += 1
+            
+            # Save AI response to memory; the calls themselves are stored as
+            # tool_call rows, so only their count is kept here
             ai_message = {
                 "type": "ai",
-                "content": response_content,
+                "content": "".join(response_parts),
                 "metadata": {
-                    "tool_calls": tool_calls_made,
+                    "tool_call_count": tool_call_count,
                     "agent_type": self.__class__.__name__
                 }
             }
-            self.memory.add_message(session_id, ai_message)
-            
-            # Save tool calls to memory
-            for tool_call in tool_calls_made:
-                tool_message = {
-                    "type": "tool_call",
-                    "content": tool_call.get("result", ""),
-                    "metadata": {
-                        "tool_name": tool_call.get("name", ""),
-                        "tool_args": tool_call.get("args", {}),
-                        "tool_id": tool_call.get("id", ""),
-                        "agent_type": self.__class__.__name__
-                    }
-                }
-                self.memory.add_message(session_id, tool_message)
+            
+            # Save the whole turn to memory in one batch
+            pending_writes.append(ai_message)
+            pending_writes.extend(tool_messages)
+            # The commit overlaps with "complete" reaching the client; it is
+            # awaited below, before the stream ends
+            writes, pending_writes = pending_writes, []
+            write_task = asyncio.create_task(asyncio.to_thread(self.memory.add_messages, session_id, writes))
             
             yield {
                 "type": "complete",
@@ -192,94 +377,298 @@ class BaseAgent(ABC):
                 "content": f"An error occurred: {str(e)}",
                 "agent_type": self.__class__.__name__
             }
+        
+        finally:
+            if not history_task.done():
+                history_task.cancel()
+            
+            if response_stream is not None:
+                # Stop the graph now rather than whenever the generator is collected
+                await response_stream.aclose()
+            
+            if write_task is not None:
+                try:
+                    await write_task
+                except Exception as e:
+                    logger.error(f"Failed to save turn for session {session_id}: {e}")
+            
+            # Persist the user message even if the turn failed part-way
+            if pending_writes:
+                await asyncio.to_thread(self.memory.add_messages, session_id, pending_writes)
     
-    async def _stream_graph_response(self, messages: List[BaseMessage]) -> AsyncGenerator[Dict[str, Any], None]:
+    async def _stream_graph_response(self, messages: List[BaseMessage], session_id: str) -> AsyncGenerator[Dict[str, Any], None]:
         """
         Stream response from the LangGraph with configurable behavior.
         This method is now generic and configurable via streaming_config.
+        
+        Tool calls are also recorded for persistence as they complete; the
+        records are handed to chat_stream in a final "_memory_records" event.
         """
+        if not self.tools or (self.streaming_config.get("skip_tools_for_plain_chat", False)
+                              and not self._needs_tools(messages)):
+            # Nothing for the graph to route to; stream the model directly
+            async for chunk in self._stream_llm_response(messages):
+                yield chunk
+            return
+        
+        tool_memory_records = []
+        # Text held back while coalescing, emitted as one message at the end
+        coalesced_parts = []
+        graph_events = None
+        
         try:
-            logger.info(f"Starting graph streaming for {len(messages)} messages")
-            logger.info(f"Available tools: {[tool.name for tool in self.tools]}")
-            logger.info(f"Streaming config: {self.streaming_config}")
+            logger.info("Starting graph streaming for %d messages", len(messages))
+            # Tools and config are fixed per agent (logged at init); per turn they are debug detail
+            logger.debug("Available tools: %s", self._tool_name_list_str)
+            logger.debug("Streaming config: %s", self.streaming_config)
+            
+            # The config is fixed for the duration of a stream; read it once
+            stream_mode = self.streaming_config["stream_mode"]
+            deduplicate_events = self.streaming_config["deduplicate_events"]
+            process_tool_calls = self.streaming_config["process_tool_calls"]
+            coalesce_text = self.streaming_config.get("coalesce_text", False)
             
-            current_response = ""
+            response_length = 0
             tool_calls_made = []
-            last_processed_event = None if self.streaming_config["deduplicate_events"] else "no_dedup"
+            debug_enabled = logger.isEnabledFor(logging.DEBUG)
+            
+            if stream_mode == "messages":
+                graph_events = self._graph_token_events(messages)
+            else:
+                graph_events = self._graph_value_events(messages, stream_mode, deduplicate_events)
+            buffer_size = self.streaming_config.get("graph_buffer_size", 32)
+            # A graph running ahead would reach its tools node while the user is
+            # still being asked, so confirmed tool calls are read one step at a time
+            confirms_tools = (process_tool_calls
+                              and self.streaming_config["require_tool_confirmation"]
+                              and not self.streaming_config["auto_execute_tools"])
+            if buffer_size and not confirms_tools:
+                # Let the graph run ahead while events are being sent to the client
+                graph_events = self._buffer_stream(graph_events, buffer_size)
             
             # Use graph for streaming processing
-            async for event in self.graph.astream(messages, stream_mode=self.streaming_config["stream_mode"]):
-                logger.debug(f"Graph event: {type(event)} - length: {len(event) if isinstance(event, list) else 'N/A'}")
+            async for new_content, last_message in graph_events:
+                # Process AI message content
+                if new_content is not None:
+                    response_length += len(new_content)
+                    if debug_enabled:
+                        logger.debug("Streaming content: %.100s...", new_content)
+                    if coalesce_text:
+                        coalesced_parts.append(new_content)
+                    else:
+                        yield {
+                            "type": "message",
+                            "content": new_content,
+                            "is_complete": False
+                        }
+                    continue
                 
-                # Process message list
-                if isinstance(event, list) and event:
-                    last_message = event[-1]
-                    
-                    # Skip duplicate events if configured
-                    if self.streaming_config["deduplicate_events"] and last_processed_event == event:
-                        continue
-                    last_processed_event = event
+                # Process tool calls based on configuration
+                tool_calls = getattr(last_message, 'tool_calls', None)
+                if process_tool_calls and tool_calls:
                     
-                    # Process AI message content
-                    if hasattr(last_message, 'content') and last_message.content:
-                        content = str(last_message.content)
-                        if content and content != current_response:
-                            # Stream new content
-                            new_content = content[len(current_response):] if current_response in content else content
-                            current_response = content
-                            
-                            if new_content.strip():
-                                logger.debug(f"Streaming content: {new_content[:100]}...")
-                                yield {
-                                    "type": "message",
-                                    "content": new_content,
-                                    "is_complete": False
+                    async for tool_event in self._process_tool_calls(tool_calls, session_id):
+                        yield tool_event
+                        if tool_event["type"] == "tool_call":
+                            tool_calls_made.append(tool_event)
+                            tool_memory_records.append({
+                                "type": "tool_call",
+                                "content": tool_event.get("result", ""),
+                                "metadata": {
+                                    "tool_name": tool_event.get("name", ""),
+                                    "tool_args": tool_event.get("args", {}),
+                                    "tool_id": tool_event.get("id", ""),
+                                    "agent_type": self.__class__.__name__
                                 }
-                    
-                    # Process tool calls based on configuration
-                    if (self.streaming_config["process_tool_calls"] and 
-                        hasattr(last_message, 'tool_calls') and last_message.tool_calls):
-                        
-                        async for tool_event in self._process_tool_calls(last_message.tool_calls, messages):
-                            yield tool_event
-                            if tool_event["type"] == "tool_call":
-                                tool_calls_made.append(tool_event)
-                    
-                    # Process tool result messages
-                    if isinstance(last_message, ToolMessage):
-                        async for result_event in self._process_tool_result(last_message, tool_calls_made):
-                            yield result_event
+                            })
+                
+                # Process tool result messages
+                if isinstance(last_message, ToolMessage):
+                    async for result_event in self._process_tool_result(last_message, tool_calls_made):
+                        yield result_event
             
-            # Mark completion
-            if current_response:
+            # Completion is signalled by chat_stream's "complete" event; only
+            # coalesced text still needs sending
+            if coalesced_parts:
                 yield {
-                    "type": "message", 
-                    "content": "",
+                    "type": "message",
+                    "content": "".join(coalesced_parts),
                     "is_complete": True
                 }
+                coalesced_parts = []
                         
-            logger.info(f"Graph streaming completed. Total response length: {len(current_response)}")
+            logger.info("Graph streaming completed. Total response length: %d", response_length)
             
         except Exception as e:
             logger.error(f"Error in graph streaming: {e}")
+            # Don't lose text that was held back before the failure
+            if coalesced_parts:
+                yield {
+                    "type": "message",
+                    "content": "".join(coalesced_parts),
+                    "is_complete": False
+                }
             error_msg = f"Sorry, I encountered an error: {str(e)}"
             yield {
                 "type": "message",
                 "content": error_msg,
                 "is_complete": True
             }
+        finally:
+            if graph_events is not None:
+                # Also reached when the caller closes this stream early
+                await graph_events.aclose()
+        
+        # Hand over whatever tool calls completed, even after an error
+        yield {
+            "type": "_memory_records",
+            "records": tool_memory_records
+        }
+    
+    async def _graph_value_events(self, messages: List[BaseMessage], stream_mode: str,
+                                  deduplicate_events: bool) -> AsyncGenerator[Tuple[Optional[str], Any], None]:
+        """
+        Run the graph in a state-snapshot mode ("values").
+        
+        Yields ``(text, None)`` for content not sent yet, then ``(None, message)``
+        for the last message of each snapshot.
+        """
+        # (index of last message, length of its content) of the last new event.
+        # With stream_mode="values" the message list only grows and a message's
+        # content only extends, so an event whose key does not increase has
+        # nothing new in it.
+        last_key = (-1, 0)
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+        
+        async for event in self._graph_astream(self._graph_input(messages), stream_mode=stream_mode):
+            if debug_enabled:
+                logger.debug("Graph event: %s - length: %s", type(event), len(event) if isinstance(event, list) else 'N/A')
+            
+            # Process message list
+            if isinstance(event, list) and event:
+                last_message = event[-1]
+                content = getattr(last_message, 'content', None)
+                content = str(content) if content else ""
+                
+                key = (len(event) - 1, len(content))
+                is_new = key > last_key
+                
+                # Skip duplicate events if configured
+                if deduplicate_events and not is_new:
+                    continue
+                
+                if is_new:
+                    # A message that grew only sends its suffix, a newly
+                    # appended message is sent whole
+                    new_content = content[last_key[1]:] if key[0] == last_key[0] else content
+                    last_key = key
+                    if new_content and not new_content.isspace():
+                        yield new_content, None
+                
+                yield None, last_message
+    
+    async def _graph_token_events(self, messages: List[BaseMessage]) -> AsyncGenerator[Tuple[Optional[str], Any], None]:
+        """
+        Run the graph with stream_mode="messages" for token-level output.
+        
+        Yields ``(token, None)`` as the model produces text and ``(None, message)``
+        for every message a node returns, taken from the "updates" stream.
+        """
+        streamed_text = False
+        
+        async for mode, payload in self._graph_astream(self._graph_input(messages), stream_mode=["messages", "updates"]):
+            if mode == "messages":
+                chunk = payload[0]
+                if isinstance(chunk, AIMessageChunk) and chunk.content and isinstance(chunk.content, str):
+                    streamed_text = True
+                    yield chunk.content, None
+                continue
+            
+            for output in payload.values():
+                # MessageGraph nodes return messages, react-style nodes a state dict
+                if isinstance(output, dict):
+                    output = output.get("messages")
+                if output is None:
+                    continue
+                for message in output if isinstance(output, list) else [output]:
+                    if isinstance(message, AIMessage) and not streamed_text and message.content:
+                        # The model did not stream (or its content is not plain
+                        # text); send the finished content instead
+                        yield str(message.content), None
+                    yield None, message
+            streamed_text = False
     
-    async def _process_tool_calls(self, tool_calls: List[Dict], messages: List[BaseMessage]) -> AsyncGenerator[Dict[str, Any], None]:
+    async def _stream_llm_response(self, messages: List[BaseMessage]) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Stream token chunks straight from the LLM, for agents without tools.
+        Emits the same message events as _stream_graph_response.
+        """
+        coalesce_text = self.streaming_config.get("coalesce_text", False)
+        response_parts = []
+        
+        try:
+            logger.info("Starting direct LLM streaming for %d messages", len(messages))
+            
+            async for chunk in self.llm.astream(messages):
+                content = chunk.content
+                if not content or not isinstance(content, str):
+                    continue
+                response_parts.append(content)
+                if not coalesce_text:
+                    yield {
+                        "type": "message",
+                        "content": content,
+                        "is_complete": False
+                    }
+            
+            if coalesce_text and response_parts:
+                yield {
+                    "type": "message",
+                    "content": "".join(response_parts),
+                    "is_complete": True
+                }
+            
+            logger.info("Direct LLM streaming completed. Total response length: %d", sum(map(len, response_parts)))
+            
+        except Exception as e:
+            logger.error(f"Error in direct LLM streaming: {e}")
+            if coalesce_text and response_parts:
+                yield {
+                    "type": "message",
+                    "content": "".join(response_parts),
+                    "is_complete": False
+                }
+            yield {
+                "type": "message",
+                "content": f"Sorry, I encountered an error: {str(e)}",
+                "is_complete": True
+            }
+        
+        # No tools, so nothing to persist beyond the reply itself
+        yield {
+            "type": "_memory_records",
+            "records": []
+        }
+    
+    async def _process_tool_calls(self, tool_calls: List[Dict], session_id: str) -> AsyncGenerator[Dict[str, Any], None]:
         """
         Process tool calls based on streaming configuration.
         Can be overridden by subclasses for custom behavior.
+        
+        All calls are detected first; their execution workflows then run
+        concurrently and their events are yielded as they arrive.
         """
+        auto_execute = self.streaming_config["auto_execute_tools"]
+        require_confirmation = self.streaming_config["require_tool_confirmation"]
+        confirmation_lock = asyncio.Lock()
+        workflows = []
+        
         for tool_call in tool_calls:
             call_name = tool_call.get('name', '')
             call_args = tool_call.get('args', {})
             call_id = tool_call.get('id', '')
             
-            logger.info(f"Tool call detected: {call_name} with args: {call_args}")
+            logger.info("Tool call detected: %s with args: %s", call_name, call_args)
             
             tool_info = self._get_tool_info(call_name)
             
@@ -294,56 +683,217 @@ class BaseAgent(ABC):
             }
             
             # Handle tool execution based on configuration
-            if self.streaming_config["auto_execute_tools"]:
+            if auto_execute:
                 # Auto-execute without confirmation
-                yield {
-                    "type": "tool_execution_start",
-                    "tool_name": call_name,
-                    "args": call_args
-                }
+                workflows.append(self._auto_execute_tool(tool_call, tool_info))
+            elif require_confirmation:
+                # Use confirmation workflow
+                workflows.append(
+                    self._serialized_tool_confirmation(tool_call, tool_info, session_id, confirmation_lock)
+                )
+        
+        async for event in self._merge_event_streams(workflows):
+            yield event
+    
+    async def _auto_execute_tool(self, tool_call: Dict, tool_info: Dict) -> AsyncGenerator[Dict[str, Any], None]:
+        """Execute a tool call without asking for confirmation."""
+        call_name = tool_call.get('name', '')
+        call_args = tool_call.get('args', {})
+        call_id = tool_call.get('id', '')
+        
+        yield {
+            "type": "tool_execution_start",
+            "tool_name": call_name,
+            "args": call_args
+        }
+        
+        try:
+            tool_result = await self._execute_tool({
+                'name': call_name,
+                'args': call_args,
+                'id': call_id
+            })
+            
+            yield {
+                "type": "tool_result",
+                "tool_name": call_name,
+                "result": str(tool_result),
+                "args": call_args,
+                "description": tool_info.get('description', ''),
+                "args_schema": tool_info.get('args_schema', {})
+            }
+            
+            yield {
+                "type": "tool_call",
+                "name": call_name,
+                "args": call_args,
+                "result": str(tool_result),
+                "id": call_id
+            }
+            
+        except Exception as tool_error:
+            logger.error(f"Tool execution error: {tool_error}")
+            yield {
+                "type": "tool_error",
+                "tool_name": call_name,
+                "error": str(tool_error)
+            }
+    
+    async def _serialized_tool_confirmation(self, tool_call: Dict, tool_info: Dict, session_id: str,
+                                            confirmation_lock: asyncio.Lock) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Run the confirmation workflow while holding confirmation_lock for the
+        asking step only. The user answers one confirmation at a time, so
+        asking is serialized; a confirmed tool executes while the next one
+        is being asked about.
+        """
+        await confirmation_lock.acquire()
+        locked = True
+        try:
+            async for event in self._handle_tool_confirmation(tool_call, tool_info, session_id):
+                yield event
+                if locked and event["type"] in _CONFIRMATION_ANSWERED_EVENTS:
+                    # The user has answered; the next tool call may ask now
+                    confirmation_lock.release()
+                    locked = False
+        finally:
+            if locked:
+                confirmation_lock.release()
+    
+    @staticmethod
+    async def _batch_text_chunks(chunks: AsyncGenerator[Dict[str, Any], None], max_chars: int,
+                                 max_ms: float) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Merge consecutive partial "message" chunks into fewer, larger ones.
+        
+        Text is sent once ``max_chars`` have gathered or ``max_ms`` after the
+        first held token, whichever comes first. Any other event flushes the
+        held text and is passed through unchanged.
+        """
+        loop = asyncio.get_running_loop()
+        parts = []
+        size = 0
+        deadline = None
+        pending = None
+        
+        def flush() -> Dict[str, Any]:
+            nonlocal parts, size, deadline
+            chunk = {"type": "message", "content": "".join(parts), "is_complete": False}
+            parts, size, deadline = [], 0, None
+            return chunk
+        
+        try:
+            while True:
+                if pending is None:
+                    # Awaited via asyncio.wait so a timeout does not cancel it
+                    pending = asyncio.ensure_future(anext(chunks))
+                timeout = None if deadline is None else max(deadline - loop.time(), 0)
+                done, _ = await asyncio.wait((pending,), timeout=timeout)
+                if not done:
+                    yield flush()
+                    continue
                 
+                task, pending = pending, None
                 try:
-                    tool_result = await self._execute_tool({
-                        'name': call_name,
-                        'args': call_args,
-                        'id': call_id
-                    })
-                    
-                    yield {
-                        "type": "tool_result",
-                        "tool_name": call_name,
-                        "result": str(tool_result),
-                        "args": call_args,
-                        "description": tool_info.get('description', ''),
-                        "args_schema": tool_info.get('args_schema', {})
-                    }
-                    
-                    yield {
-                        "type": "tool_call",
-                        "name": call_name,
-                        "args": call_args,
-                        "result": str(tool_result),
-                        "id": call_id
-                    }
-                    
-                except Exception as tool_error:
-                    logger.error(f"Tool execution error: {tool_error}")
-                    yield {
-                        "type": "tool_error",
-                        "tool_name": call_name,
-                        "error": str(tool_error)
-                    }
-                    
-            elif self.streaming_config["require_tool_confirmation"]:
-                # Use confirmation workflow
-                async for confirmation_event in self._handle_tool_confirmation(tool_call, tool_info, messages):
-                    yield confirmation_event
+                    chunk = task.result()
+                except StopAsyncIteration:
+                    break
+                
+                if chunk["type"] == "message" and not chunk.get("is_complete"):
+                    parts.append(chunk["content"])
+                    size += len(chunk["content"])
+                    if deadline is None:
+                        deadline = loop.time() + max_ms / 1000
+                    if size >= max_chars:
+                        yield flush()
+                    continue
+                
+                if parts:
+                    yield flush()
+                yield chunk
+            
+            if parts:
+                yield flush()
+        finally:
+            if pending is not None:
+                pending.cancel()
+                await asyncio.wait((pending,))
+            await chunks.aclose()
+    
+    @staticmethod
+    async def _buffer_stream(stream: AsyncGenerator, maxsize: int) -> AsyncGenerator[Any, None]:
+        """Consume a stream in a background task, keeping up to ``maxsize`` items ready."""
+        # Items are (item, error) pairs; (None, None) marks the end of the stream
+        queue: asyncio.Queue = asyncio.Queue(maxsize)
+        
+        async def produce() -> None:
+            try:
+                async for item in stream:
+                    await queue.put((item, None))
+            except Exception as e:
+                await queue.put((None, e))
+                return
+            finally:
+                await stream.aclose()
+            await queue.put((None, None))
+        
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                item, error = await queue.get()
+                if error is not None:
+                    raise error
+                if item is None:
+                    break
+                yield item
+        finally:
+            if not producer.done():
+                producer.cancel()
+            # Wait for the producer's teardown so the source stream (and the
+            # graph behind it) is closed before this generator finishes
+            await asyncio.gather(producer, return_exceptions=True)
+            # A producer cancelled before it started never closed the stream
+            await stream.aclose()
+    
+    async def _merge_event_streams(self, streams: List[AsyncGenerator]) -> AsyncGenerator[Dict[str, Any], None]:
+        """Run several event streams concurrently, yielding events as they arrive."""
+        if len(streams) <= 1:
+            for stream in streams:
+                async for event in stream:
+                    yield event
+            return
+        
+        queue: asyncio.Queue = asyncio.Queue()
+        
+        async def drain(stream: AsyncGenerator) -> None:
+            try:
+                async for event in stream:
+                    await queue.put(event)
+            finally:
+                # Sentinel marking the end of this stream
+                await queue.put(None)
+        
+        tasks = [asyncio.create_task(drain(stream)) for stream in streams]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                event = await queue.get()
+                if event is None:
+                    remaining -= 1
+                else:
+                    yield event
+            # Surface any unexpected failure from the streams
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
     
     async def _process_tool_result(self, tool_message: ToolMessage, tool_calls_made: List[Dict]) -> AsyncGenerator[Dict[str, Any], None]:
         """
         Process tool result messages. Can be overridden by subclasses.
         """
-        logger.info(f"Tool result message received: {tool_message.content[:100]}...")
+        logger.info("Tool result message received: %.100s...", tool_message.content)
         
         # Find the corresponding tool call and update result
         for tool_call in tool_calls_made:
@@ -360,20 +910,12 @@ class BaseAgent(ABC):
                 }
                 break
     
-    async def _handle_tool_confirmation(self, tool_call: Dict, tool_info: Dict, messages: List[BaseMessage]) -> AsyncGenerator[Dict[str, Any], None]:
+    async def _handle_tool_confirmation(self, tool_call: Dict, tool_info: Dict, session_id: str) -> AsyncGenerator[Dict[str, Any], None]:
         """Handle tool confirmation workflow."""
         call_name = tool_call.get('name', '')
         call_args = tool_call.get('args', {})
         call_id = tool_call.get('id', '')
-        
-        # Get session_id
-        session_id = None
-        for msg in messages:
-            if hasattr(msg, 'additional_kwargs') and 'session_id' in msg.additional_kwargs:
-                session_id = msg.additional_kwargs['session_id']
-                break
-        if not session_id:
-            session_id = 'default'
+        session_id = session_id or 'default'
         
         # Send tool confirmation request
         yield {
@@ -386,7 +928,7 @@ class BaseAgent(ABC):
         }
         
         # Wait for user confirmation
-        confirmed, updated_args, error_msg = await self.confirmation_manager.request_confirmation(
+        confirmed, updated_args, error_msg = await self._request_confirmation(
             session_id=session_id,
             tool_name=call_name,
             tool_args=call_args,
@@ -452,58 +994,49 @@ class BaseAgent(ABC):
         tool_name = tool_call.get("name", "")
         tool_args = tool_call.get("args", {})
         
-        logger.info(f"Executing tool: {tool_name} with args: {tool_args}")
+        logger.info("Executing tool: %s with args: %s", tool_name, tool_args)
         
-        # Find the tool by name
-        for tool in self.tools:
-            if tool.name == tool_name:
-                try:
-                    # Execute the tool with the provided arguments
-                    result = await tool.ainvoke(tool_args) if hasattr(tool, 'ainvoke') else tool.invoke(tool_args)
-                    return str(result)
-                except Exception as e:
-                    logger.error(f"Tool {tool_name} execution failed: {e}")
-                    return f"Tool execution failed: {str(e)}"
+        invoke = self._tool_invokers.get(tool_name)
+        if invoke is None:
+            return f"Tool {tool_name} not found"
         
-        return f"Tool {tool_name} not found"
+        try:
+            # Execute the tool with the provided arguments
+            result = await invoke(tool_args)
+            return str(result)
+        except Exception as e:
+            logger.error(f"Tool {tool_name} execution failed: {e}")
+            return f"Tool execution failed: {str(e)}"
 
+    @staticmethod
+    def _build_tool_invoker(tool: BaseTool) -> Callable[[Dict[str, Any]], Awaitable[Any]]:
+        """Pick how a tool is awaited, once: natively async, or a sync invoke run in a thread."""
+        if hasattr(tool, 'ainvoke'):
+            return tool.ainvoke
+        # Keep synchronous tools off the event loop
+        return partial(asyncio.to_thread, tool.invoke)
+    
     def _get_tool_info(self, tool_name: str) -> Dict[str, Any]:
-        """Get detailed information about a tool."""
-        for tool in self.tools:
-            if tool.name == tool_name:
-                tool_info = {
-                    'name': tool.name,
-                    'description': tool.description,
-                    'args_schema': {}
-                }
-                
-                # 获取参数 schema
-                if hasattr(tool, 'args_schema') and tool.args_schema:
-                    schema = tool.args_schema
-                    if hasattr(schema, 'model_fields'):
-                        # Pydantic v2
-                        tool_info['args_schema'] = {
-                            field_name: {
-                                'type': str(field_info.annotation),
-                                'description': field_info.description or '',
-                                'required': field_info.is_required()
-                            }
-                            for field_name, field_info in schema.model_fields.items()
-                        }
-                    elif hasattr(schema, '__fields__'):
-                        # Pydantic v1
-                        tool_info['args_schema'] = {
-                            field_name: {
-                                'type': str(field_info.type_),
-                                'description': field_info.field_info.description or '',
-                                'required': field_info.required
-                            }
-                            for field_name, field_info in schema.__fields__.items()
-                        }
-                
-                return tool_info
+        """Get detailed information about a tool (precomputed at init)."""
+        tool_info = self._tool_info_cache.get(tool_name)
+        if tool_info is None:
+            return {'name': tool_name, 'description': '', 'args_schema': {}}
+        return tool_info
+    
+    @staticmethod
+    def _build_tool_info(tool: BaseTool) -> Dict[str, Any]:
+        """Build the name/description/args_schema info for a tool."""
+        tool_info = {
+            'name': tool.name,
+            'description': tool.description,
+            'args_schema': {}
+        }
+        
+        # 获取参数 schema
+        if hasattr(tool, 'args_schema') and tool.args_schema:
+            tool_info['args_schema'] = _schema_to_dict(tool.args_schema)
         
-        return {'name': tool_name, 'description': '', 'args_schema': {}}
+        return tool_info
     
     # Common utility methods that all agents can use
     def get_session_info(self, session_id: str) -> Dict[str, Any]:
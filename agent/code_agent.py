@@ -4,13 +4,19 @@ This demonstrates creating a CodeAgent that specializes in code-related tasks.
 """
 from typing import List
 from langchain.tools import BaseTool
-from langgraph.prebuilt import ToolNode, create_react_agent
+from langchain.schema import BaseMessage
+from langgraph.prebuilt import create_react_agent
 
-from agent.base_agent import BaseAgent
+from agent.base_agent import BaseAgent, _IdentityCache
+from agent.tools.math_tools import might_need_math
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Compiled react graphs per (llm, tools); the graph's ToolNode runs these exact
+# tool instances, so entries are matched by identity
+_REACT_GRAPH_CACHE = _IdentityCache()
+
 
 class CodeAgent(BaseAgent):
     """
@@ -22,15 +28,8 @@ class CodeAgent(BaseAgent):
         """Initialize code-specific components."""
         # Get tools specific to code agent
         self.tools = self._get_tools()
-        self.tool_node = ToolNode(self.tools) if self.tools else None
-        
-        # Bind tools to LLM
-        if self.tools:
-            self.llm_with_tools = self.llm.bind_tools(self.tools)
-        else:
-            self.llm_with_tools = self.llm
         
-        # Build the graph
+        # Build the graph (the react graph binds the tools and runs them itself)
         self.graph = self._build_graph()
         
         logger.info(f"CodeAgent initialized with {len(self.tools)} tools")
@@ -53,14 +52,14 @@ class CodeAgent(BaseAgent):
         """Build the LangGraph for code agent."""
         try:
             if self.tools:
-                # Use create_react_agent if we have tools
-                graph = create_react_agent(self.llm, self.tools)
+                # Use create_react_agent if we have tools (compiled once per llm/tool set)
+                graph = self._get_react_graph()
             else:
                 # Simple chat agent without tools
                 from langgraph.graph.message import MessageGraph
                 
                 def call_model(messages):
-                    return self.llm_with_tools.invoke(messages)
+                    return self.llm.invoke(messages)
                 
                 workflow = MessageGraph()
                 workflow.add_node("agent", call_model)
@@ -70,4 +69,19 @@ class CodeAgent(BaseAgent):
             return graph
         except Exception as e:
             logger.error(f"Failed to create code agent graph: {e}")
-            raise
\ No newline at end of file
+            raise
+    
+    def _needs_tools(self, messages: List[BaseMessage]) -> bool:
+        """The code agent's tools are math tools, so only arithmetic needs them."""
+        return might_need_math(str(messages[-1].content))
+    
+    def _graph_input(self, messages):
+        """The react graph keeps its messages under a "messages" state key."""
+        if self.tools:
+            return {"messages": messages}
+        return messages
+    
+    def _get_react_graph(self):
+        """Get the compiled react graph for this llm and tool set, building it on first use."""
+        llm, tools = self.llm, self.tools
+        return _REACT_GRAPH_CACHE.get_or_build((llm, *tools), lambda: create_react_agent(llm, tools))
\ No newline at end of file
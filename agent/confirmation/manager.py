@@ -3,7 +3,9 @@ Tool confirmation manager for handling user confirmations before tool execution.
 Implements timeout and confirmation flow management.
 """
 import asyncio
-from typing import Dict, Any, Optional, Callable, Awaitable
+import heapq
+from collections import deque
+from typing import Deque, Dict, Any, List, Optional, Tuple
 from uuid import uuid4
 from dataclasses import dataclass
 from enum import Enum
@@ -53,6 +55,11 @@ class ToolConfirmationManager:
         self.default_timeout = default_timeout
         self._pending_requests: Dict[str, ToolConfirmationRequest] = {}
         self._confirmation_futures: Dict[str, asyncio.Future] = {}
+        # Ids of the still-pending requests of each session, oldest first
+        self._session_index: Dict[str, Deque[str]] = {}
+        # (expires_at, request_id) min-heap; entries of finished requests are
+        # pruned as requests are cleaned up, or skipped when popped
+        self._expiry_heap: List[Tuple[float, str]] = []
         
         logger.info(f"Tool confirmation manager initialized with {default_timeout}s timeout")
     
@@ -80,7 +87,7 @@ class ToolConfirmationManager:
             Tuple of (confirmed, updated_args, error_message)
         """
         timeout = timeout_seconds or self.default_timeout
-        request_id = str(uuid4())
+        request_id = uuid4().hex
         
         # Create confirmation request
         request = ToolConfirmationRequest(
@@ -96,9 +103,11 @@ class ToolConfirmationManager:
         
         # Store the request
         self._pending_requests[request_id] = request
+        self._session_index.setdefault(session_id, deque()).append(request_id)
+        heapq.heappush(self._expiry_heap, (request.timestamp + timeout, request_id))
         
-        # Create future for the confirmation
-        future = asyncio.Future()
+        # Create future for the confirmation (loop factory avoids the running-loop lookup in Future())
+        future = asyncio.get_running_loop().create_future()
         self._confirmation_futures[request_id] = future
         
         logger.info(f"Created confirmation request {request_id} for tool {tool_name} in session {session_id}")
@@ -124,6 +133,7 @@ class ToolConfirmationManager:
             logger.warning(f"Confirmation request {request_id} timed out after {timeout}s")
             if request_id in self._pending_requests:
                 self._pending_requests[request_id].status = ConfirmationStatus.TIMEOUT
+                self._unindex_request(self._pending_requests[request_id])
             
             return False, tool_args, f"Tool confirmation timed out after {timeout} seconds"
             
@@ -149,28 +159,27 @@ class ToolConfirmationManager:
             True if confirmation was processed successfully
         """
         # Find the pending request for this session
-        request_id = None
-        for req_id, request in self._pending_requests.items():
-            if request.session_id == session_id and request.status == ConfirmationStatus.PENDING:
-                request_id = req_id
-                break
+        request = self.get_pending_request(session_id)
         
-        if not request_id:
+        if request is None:
             logger.warning(f"No pending confirmation request found for session {session_id}")
             return False
         
-        request = self._pending_requests[request_id]
+        request_id = request.id
         
         # Check if expired
         if request.is_expired():
             logger.warning(f"Confirmation request {request_id} has expired")
             request.status = ConfirmationStatus.TIMEOUT
+            self._unindex_request(request)
             return False
         
         # Update request status and arguments
         request.status = ConfirmationStatus.CONFIRMED if confirmed else ConfirmationStatus.REJECTED
+        self._unindex_request(request)
         if confirmed and updated_args:
-            request.tool_args = updated_args
+            # Keep a plain dict copy: it is echoed into JSON stream events
+            request.tool_args = dict(updated_args)
         
         # Resolve the future
         future = self._confirmation_futures.get(request_id)
@@ -190,10 +199,11 @@ class ToolConfirmationManager:
         Returns:
             Pending request or None if not found
         """
-        for request in self._pending_requests.values():
-            if request.session_id == session_id and request.status == ConfirmationStatus.PENDING:
-                return request
-        return None
+        # Only pending requests are indexed, so the oldest one is the answer
+        request_ids = self._session_index.get(session_id)
+        if not request_ids:
+            return None
+        return self._pending_requests.get(request_ids[0])
     
     def has_pending_request(self, session_id: str) -> bool:
         """
@@ -210,8 +220,10 @@ class ToolConfirmationManager:
     def _cleanup_request(self, request_id: str) -> None:
         """Clean up a completed confirmation request."""
         # Remove from pending requests
-        if request_id in self._pending_requests:
-            del self._pending_requests[request_id]
+        request = self._pending_requests.pop(request_id, None)
+        if request is not None:
+            self._unindex_request(request)
+            self._prune_expiry_heap()
         
         # Remove from futures
         if request_id in self._confirmation_futures:
@@ -222,6 +234,31 @@ class ToolConfirmationManager:
         
         logger.debug(f"Cleaned up confirmation request {request_id}")
     
+    def _prune_expiry_heap(self) -> None:
+        """Drop heap entries of finished requests so the heap stays bounded without a sweeper."""
+        heap = self._expiry_heap
+        pending = self._pending_requests
+        # Finished entries at the top are free to pop
+        while heap and heap[0][1] not in pending:
+            heapq.heappop(heap)
+        # The rest are compacted once they outnumber the live entries
+        if len(heap) > 2 * len(pending) + 8:
+            self._expiry_heap = [entry for entry in heap if entry[1] in pending]
+            heapq.heapify(self._expiry_heap)
+    
+    def _unindex_request(self, request: ToolConfirmationRequest) -> None:
+        """Drop a request from its session's pending index."""
+        request_ids = self._session_index.get(request.session_id)
+        if request_ids is None:
+            return
+        try:
+            request_ids.remove(request.id)
+        except ValueError:
+            # Already unindexed when its status left PENDING
+            return
+        if not request_ids:
+            del self._session_index[request.session_id]
+    
     def cleanup_expired_requests(self) -> int:
         """
         Clean up expired confirmation requests.
@@ -230,9 +267,14 @@ class ToolConfirmationManager:
             Number of expired requests cleaned up
         """
         expired_ids = []
+        now = time.time()
+        heap = self._expiry_heap
         
-        for request_id, request in self._pending_requests.items():
-            if request.is_expired():
+        # Only entries that are due get popped, so a sweep with nothing
+        # expired costs O(1)
+        while heap and heap[0][0] < now:
+            _, request_id = heapq.heappop(heap)
+            if request_id in self._pending_requests:
                 expired_ids.append(request_id)
         
         for request_id in expired_ids:
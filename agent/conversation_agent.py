@@ -2,22 +2,29 @@
 Conversation agent implementation extending the base agent.
 Provides conversation-focused functionality with tool calling support.
 """
-from typing import List, Dict, Any, AsyncGenerator
+import logging
+from functools import lru_cache
+from typing import List
 from langchain.tools import BaseTool
-from langchain.schema import BaseMessage, AIMessage
+from langchain.schema import AIMessage, BaseMessage
 from langchain_core.messages import ToolMessage
-from langgraph.prebuilt import ToolNode
 from langgraph.graph.message import MessageGraph
-from langgraph.graph import StateGraph, END
+from langgraph.graph import END
 
 from agent.base_agent import BaseAgent
-from agent.tools.math_tools import add, subtract, multiply, divide
+from agent.tools.math_tools import add, subtract, multiply, divide, might_need_math
 from agent.tools.web_search import BigModelSearchTool
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__, "DEBUG")
 
 
+@lru_cache(maxsize=4)
+def _get_search_tool(api_key: str) -> BigModelSearchTool:
+    """Search tool for an API key, shared so agents end up with identical tool sets."""
+    return BigModelSearchTool(api_key=api_key)
+
+
 class ConversationAgent(BaseAgent):
     """Conversation agent with LangGraph integration and tool calling."""
     
@@ -27,7 +34,7 @@ class ConversationAgent(BaseAgent):
         streaming_config = {
             "require_tool_confirmation": True,
             "auto_execute_tools": False,
-            "stream_mode": "values",
+            "stream_mode": "messages",
             "process_tool_calls": True,
             "deduplicate_events": True
         }
@@ -37,16 +44,17 @@ class ConversationAgent(BaseAgent):
         """Initialize conversation-specific components."""
         # Get tools specific to conversation agent
         self.tools = self._get_tools()
-        self.tool_node = ToolNode(self.tools)
+        self.tool_node = self._get_tool_node(self.tools)
         
         # Bind tools to LLM
-        self.llm_with_tools = self.llm.bind_tools(self.tools)
+        self.llm_with_tools = self._bind_tools(self.tools)
         
         # Build the graph
         self.graph = self._build_graph()
         
-        logger.info(f"LLM with tools type: {type(self.llm_with_tools)}")
-        logger.info(f"LLM tools bound: {hasattr(self.llm_with_tools, 'kwargs') and 'tools' in getattr(self.llm_with_tools, 'kwargs', {})}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("LLM with tools type: %s", type(self.llm_with_tools))
+            logger.debug("LLM tools bound: %s", 'tools' in getattr(self.llm_with_tools, 'kwargs', {}))
     
     def _get_tools(self) -> List[BaseTool]:
         """Get tools specific to conversation agent."""
@@ -55,19 +63,25 @@ class ConversationAgent(BaseAgent):
         if api_key is None or not isinstance(api_key, str) or api_key == "":
             return [add, subtract, multiply, divide]
         else:
-            return [add, subtract, multiply, divide, BigModelSearchTool(api_key=api_key)]
+            return [add, subtract, multiply, divide, _get_search_tool(api_key)]
+    
+    def _needs_tools(self, messages: List[BaseMessage]) -> bool:
+        """Any question may need web search; otherwise only arithmetic needs tools."""
+        if any(isinstance(tool, BigModelSearchTool) for tool in self.tools):
+            return True
+        return might_need_math(str(messages[-1].content))
         
     def _build_graph(self):
         """Build a conversation graph that handles tool calling and summarization."""
-        from langgraph.graph import MessageGraph
-        
         def should_continue(messages):
             """Determine if we should continue to tool calling or end."""
             last_message = messages[-1]
             
             # 检查是否有工具调用
-            if hasattr(last_message, 'tool_calls') and last_message.tool_calls:
-                logger.info(f"Tool calls detected: {[tc.get('name', '') for tc in last_message.tool_calls]}")
+            tool_calls = getattr(last_message, 'tool_calls', None)
+            if tool_calls:
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info("Tool calls detected: %s", [tc.get('name', '') for tc in tool_calls])
                 return "tools"
             
             # 检查是否是工具结果，如果是，回到agent进行总结
@@ -77,9 +91,9 @@ class ConversationAgent(BaseAgent):
                 
             return END
         
-        def call_model(messages):
+        async def call_model(messages):
             """Call the LLM with messages."""
-            logger.info(f"Calling model with {len(messages)} messages")
+            logger.info("Calling model with %d messages", len(messages))
             
             # 检查最后的消息类型，如果有工具结果，添加指引让AI总结
             if messages and isinstance(messages[-1], ToolMessage):
@@ -87,16 +101,18 @@ class ConversationAgent(BaseAgent):
                 summary_instruction = AIMessage(content="请基于上述搜索结果，为用户提供一个清晰、有用的回答。")
                 messages = messages + [summary_instruction]
             
-            response = self.llm_with_tools.invoke(messages)
-            logger.info(f"Model response type: {type(response)}, has tool_calls: {hasattr(response, 'tool_calls') and bool(response.tool_calls)}")
+            # Awaited on the event loop rather than run in LangGraph's thread pool
+            response = await self.llm_with_tools.ainvoke(messages)
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Model response type: %s, has tool_calls: %s", type(response), bool(getattr(response, 'tool_calls', None)))
             return response
         
-        def call_tools(messages):
-            """Execute tool calls using ToolNode."""
-            logger.info(f"Executing tools with {len(messages)} messages")
+        async def call_tools(messages):
+            """Execute tool calls using ToolNode (calls in one turn run concurrently)."""
+            logger.info("Executing tools with %d messages", len(messages))
             try:
-                result = self.tool_node.invoke({"messages": messages})
-                logger.info(f"Tool execution completed, result type: {type(result)}")
+                result = await self.tool_node.ainvoke({"messages": messages})
+                logger.info("Tool execution completed, result type: %s", type(result))
                 
                 # 确保返回正确格式的消息
                 if isinstance(result, dict) and 'messages' in result:
@@ -109,7 +125,6 @@ class ConversationAgent(BaseAgent):
             except Exception as e:
                 logger.error(f"Tool execution failed: {e}")
                 # 返回一个错误消息
-                from langchain_core.messages import AIMessage
                 return [AIMessage(content=f"工具执行失败: {str(e)}")]
         
         # Create the graph
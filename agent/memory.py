@@ -2,7 +2,10 @@
 Memory management module for chat history and context.
 Handles chat history compression when context exceeds limits.
 """
-from typing import List, Dict, Any, Tuple
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Tuple, Union
 from langchain.schema import BaseMessage, HumanMessage, AIMessage, SystemMessage
 from langchain.schema.language_model import BaseLanguageModel
 
@@ -12,13 +15,28 @@ from utils.logger import get_logger
 logger = get_logger(__name__)
 
 
+@dataclass(frozen=True)
+class _SessionHistory:
+    """Cached history of one session; replaced, never mutated, on every change."""
+    raw: List[Dict[str, Any]]
+    total_chars: int
+    # LangChain messages for `raw`, built on first uncompressed read
+    messages: Optional[List[BaseMessage]] = None
+
+
+def _content_length(message: Dict[str, Any]) -> int:
+    """Character count of a raw message's content."""
+    return len(str(message.get("content", "")))
+
+
 class MemoryManager:
     """Manages chat history and memory compression."""
     
     def __init__(self, 
                  db: ChatHistoryDatabaseInterface, 
                  llm: BaseLanguageModel,
-                 max_characters: int = 3200):
+                 max_characters: int = 3200,
+                 history_cache_size: int = 256):
         """
         Initialize memory manager.
         
@@ -26,10 +44,17 @@ class MemoryManager:
             db: Database interface for persistence
             llm: Language model for summarization
             max_characters: Maximum characters before compression
+            history_cache_size: Maximum number of sessions whose raw history is kept in memory
         """
         self.db = db
         self.llm = llm
         self.max_characters = max_characters
+        
+        # History per session (LRU), kept in step with our own writes.
+        # Entries are replaced rather than mutated so readers keep a stable snapshot.
+        self.history_cache_size = history_cache_size
+        self._history_cache: "OrderedDict[str, _SessionHistory]" = OrderedDict()
+        self._history_cache_lock = threading.Lock()
         logger.info(f"Memory manager initialized with max_characters={max_characters}")
     
     def add_message(self, session_id: str, message: Dict[str, Any]) -> None:
@@ -43,8 +68,34 @@ class MemoryManager:
         # Save to database (excluding summarized content)
         if not message.get("is_summary", False):
             self.db.save_message(session_id, message)
+            self._extend_cached_history(session_id, [message])
         
-        logger.debug(f"Added message to session {session_id}: {message.get('type', 'unknown')}")
+        logger.debug("Added message to session %s: %s", session_id, message.get('type', 'unknown'))
+    
+    def add_messages(self, session_id: str, messages: List[Union[Dict[str, Any], BaseMessage]]) -> None:
+        """
+        Add several messages to the session in one database write.
+        
+        Args:
+            session_id: Session identifier
+            messages: Message data or LangChain messages, in order. A human or
+                system message is reused as-is in the cached history.
+        """
+        to_save = []
+        built = []
+        for message in messages:
+            if isinstance(message, BaseMessage):
+                to_save.append({"type": message.type, "content": message.content, "metadata": {}})
+                built.append(message if isinstance(message, (HumanMessage, SystemMessage)) else None)
+            # Save to database (excluding summarized content)
+            elif not message.get("is_summary", False):
+                to_save.append(message)
+                built.append(None)
+        if to_save:
+            self.db.save_messages(session_id, to_save)
+            self._extend_cached_history(session_id, to_save, built)
+        
+        logger.debug("Added %d messages to session %s", len(to_save), session_id)
     
     def get_chat_history(self, session_id: str) -> Tuple[List[BaseMessage], bool]:
         """
@@ -56,22 +107,97 @@ class MemoryManager:
         Returns:
             Tuple of (messages, was_compressed)
         """
-        # Get raw history from database
-        raw_messages = self.db.get_chat_history(session_id)
+        # Get history (cached unless the stored message count moved on)
+        history = self._get_session_history(session_id)
+        total_chars = history.total_chars
         
         # Check if compression is needed
-        total_chars = sum(len(str(msg.get("content", ""))) for msg in raw_messages)
-        
         if total_chars <= self.max_characters:
             # No compression needed
-            messages = self._convert_to_langchain_messages(raw_messages)
-            return messages, False
+            messages = history.messages
+            if messages is None:
+                messages = self._convert_to_langchain_messages(history.raw)
+                self._store_converted_history(session_id, history, messages)
+            # Callers may extend the returned list
+            return list(messages), False
         else:
             # Compression needed
             logger.info(f"Compressing history for session {session_id} ({total_chars} chars > {self.max_characters})")
-            compressed_messages = self._compress_history(raw_messages)
+            compressed_messages = self._compress_history(history.raw)
             return compressed_messages, True
     
+    def _get_session_history(self, session_id: str) -> _SessionHistory:
+        """Get a session's history, reloading from the database only when the cached copy is stale."""
+        with self._history_cache_lock:
+            cached = self._history_cache.get(session_id)
+        
+        # A count query is much cheaper than loading and decoding every row;
+        # it also catches writes made by other processes sharing the database
+        if cached is not None and self.db.get_message_count(session_id) == len(cached.raw):
+            with self._history_cache_lock:
+                if session_id in self._history_cache:
+                    self._history_cache.move_to_end(session_id)
+            return cached
+        
+        raw_messages = self.db.get_chat_history(session_id)
+        history = _SessionHistory(raw=raw_messages, total_chars=sum(map(_content_length, raw_messages)))
+        with self._history_cache_lock:
+            self._history_cache[session_id] = history
+            self._history_cache.move_to_end(session_id)
+            while len(self._history_cache) > self.history_cache_size:
+                self._history_cache.popitem(last=False)
+        return history
+    
+    def _store_converted_history(self, session_id: str, history: _SessionHistory, messages: List[BaseMessage]) -> None:
+        """Remember the LangChain messages built for a cached history, unless it changed meanwhile."""
+        with self._history_cache_lock:
+            if self._history_cache.get(session_id) is history:
+                self._history_cache[session_id] = _SessionHistory(
+                    raw=history.raw, total_chars=history.total_chars, messages=messages
+                )
+    
+    def _extend_cached_history(self, session_id: str, messages: List[Dict[str, Any]],
+                               built: Optional[List[Optional[BaseMessage]]] = None) -> None:
+        """
+        Append freshly saved messages to a cached history, if the session is cached.
+        
+        ``built`` may hold an already built LangChain message per entry (or None).
+        """
+        new_raw = [
+            {
+                "type": message.get("type", "unknown"),
+                "content": message.get("content", ""),
+                "metadata": message.get("metadata", {}),
+                "character_count": _content_length(message)
+            }
+            for message in messages
+        ]
+        with self._history_cache_lock:
+            cached = self._history_cache.get(session_id)
+            if cached is not None:
+                # Only the new rows need converting
+                self._history_cache[session_id] = _SessionHistory(
+                    raw=cached.raw + new_raw,
+                    total_chars=cached.total_chars + sum(row["character_count"] for row in new_raw),
+                    messages=(
+                        cached.messages + self._convert_new_rows(new_raw, built)
+                        if cached.messages is not None else None
+                    )
+                )
+    
+    def _convert_new_rows(self, rows: List[Dict[str, Any]],
+                          built: Optional[List[Optional[BaseMessage]]]) -> List[BaseMessage]:
+        """Convert rows to LangChain messages, reusing the ones already built."""
+        if built is None:
+            return self._convert_to_langchain_messages(rows)
+        messages = []
+        for row, message in zip(rows, built):
+            if message is not None:
+                messages.append(message)
+            else:
+                messages.extend(self._convert_to_langchain_messages([row]))
+        return messages
+    
     def _convert_to_langchain_messages(self, raw_messages: List[Dict[str, Any]]) -> List[BaseMessage]:
         """Convert raw messages to LangChain message format."""
         messages = []
@@ -91,7 +217,8 @@ class MemoryManager:
                 tool_name = msg.get("metadata", {}).get("tool_name", "unknown")
                 tool_args = msg.get("metadata", {}).get("tool_args", {})
                 tool_content = f"Tool: {tool_name}\nArguments: {tool_args}\nResult: {content}"
-                messages.append(AIMessage(content=tool_content))
+                # Tagged so the agent can recognise stored tool results later
+                messages.append(AIMessage(content=tool_content, response_metadata={"tool_name": tool_name}))
         
         return messages
     
@@ -161,12 +288,14 @@ Summary:"""
     def clear_session(self, session_id: str) -> None:
         """Clear all messages for a session."""
         self.db.delete_session(session_id)
+        with self._history_cache_lock:
+            self._history_cache.pop(session_id, None)
         logger.info(f"Cleared session {session_id}")
     
     def get_session_stats(self, session_id: str) -> Dict[str, Any]:
         """Get statistics for a session."""
         total_chars = self.db.get_total_characters(session_id)
-        message_count = len(self.db.get_chat_history(session_id))
+        message_count = self.db.get_message_count(session_id)
         needs_compression = total_chars > self.max_characters
         
         return {
@@ -2,9 +2,10 @@
 Model configuration and loading utilities.
 Provides unified interface for different LLM and embedding providers.
 """
+import os
 import yaml
-from typing import Dict, Any, Union
-from pathlib import Path
+from functools import lru_cache
+from typing import Dict, Any, Optional
 
 from langchain_openai import ChatOpenAI, AzureChatOpenAI, OpenAIEmbeddings, AzureOpenAIEmbeddings
 from langchain.schema.language_model import BaseLanguageModel
@@ -24,6 +25,20 @@ from utils.logger import get_logger
 logger = get_logger(__name__)
 
 
+@lru_cache(maxsize=8)
+def _load_config_cached(config_path: str, mtime_ns: int) -> Dict[str, Any]:
+    """
+    Parse a YAML configuration file, memoized per (path, mtime).
+    
+    The mtime is part of the cache key so an edited config file is
+    re-parsed on the next load instead of serving a stale snapshot.
+    """
+    with open(config_path, 'r', encoding='utf-8') as file:
+        config = yaml.safe_load(file)
+    logger.info(f"Loaded configuration from {config_path}")
+    return config
+
+
 class ModelLoader:
     """Unified model loader for different providers."""
     
@@ -36,33 +51,50 @@ class ModelLoader:
         """
         self.config_path = config_path
         self.config = self._load_config()
+        
+        # LLM client shared by every agent using this loader, and the llm
+        # config section it was built from
+        self._llm: Optional[BaseLanguageModel] = None
+        self._llm_config: Optional[Dict[str, Any]] = None
     
     def _load_config(self) -> Dict[str, Any]:
-        """Load configuration from YAML file."""
+        """Load configuration from YAML file (cached until the file changes)."""
         try:
-            with open(self.config_path, 'r', encoding='utf-8') as file:
-                config = yaml.safe_load(file)
-                logger.info(f"Loaded configuration from {self.config_path}")
-                return config
+            config_path = os.path.abspath(self.config_path)
+            return _load_config_cached(config_path, os.stat(config_path).st_mtime_ns)
         except Exception as e:
             logger.error(f"Failed to load config from {self.config_path}: {e}")
             raise
     
+    def reload_config(self) -> None:
+        """Refresh the configuration; a no-op parse when the file is unchanged."""
+        self.config = self._load_config()
+    
     def load_llm(self) -> BaseLanguageModel:
-        """Load LLM model based on configuration."""
+        """Load LLM model based on configuration (reused until the llm config changes)."""
         llm_config = self.config.get('llm', {})
+        # The parsed config is cached per file version, so an unchanged file
+        # yields the very same section object
+        if self._llm is not None and llm_config is self._llm_config:
+            return self._llm
+        
         provider = llm_config.get('provider', '').lower()
         
         if provider == 'azure':
-            return self._load_azure_llm(llm_config)
+            llm = self._load_azure_llm(llm_config)
         elif provider == 'openai':
-            return self._load_openai_llm(llm_config)
+            llm = self._load_openai_llm(llm_config)
+        elif provider == 'vllm':
+            llm = self._load_vllm_llm(llm_config)
         elif provider == 'google':
             if not GOOGLE_AVAILABLE:
                 raise ValueError("Google Generative AI not available. Install langchain-google-genai package.")
-            return self._load_google_llm(llm_config)
+            llm = self._load_google_llm(llm_config)
         else:
             raise ValueError(f"Unsupported LLM provider: {provider}")
+        
+        self._llm, self._llm_config = llm, llm_config
+        return llm
     
     def load_embedding(self) -> Embeddings:
         """Load embedding model based on configuration."""
@@ -114,6 +146,19 @@ class ModelLoader:
             streaming=True
         )
     
+    def _load_vllm_llm(self, config: Dict[str, Any]) -> ChatOpenAI:
+        """Load a model served by vLLM through its OpenAI-compatible API."""
+        # vLLM batches concurrent requests on the server; tool calling needs
+        # the server started with --enable-auto-tool-choice
+        return ChatOpenAI(
+            base_url=config['base_url'],
+            api_key=config.get('api_key') or "EMPTY",
+            model=config['model'],
+            temperature=config.get('temperature', 0.7),
+            max_tokens=config.get('max_tokens', 2000),
+            streaming=True
+        )
+    
     def _load_google_llm(self, config: Dict[str, Any]) -> BaseLanguageModel:
         """Load Google Generative AI LLM."""
         return ChatGoogleGenerativeAI(
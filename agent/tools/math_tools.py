@@ -2,12 +2,27 @@
 Math tools for the conversation agent.
 Provides basic arithmetic operations for testing tool calling functionality.
 """
+import re
 from typing import Any, Dict
 from langchain.tools import tool
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Anything that could be arithmetic: digits, operators, number or operation words.
+# Deliberately broad; a false positive only means the tools stay available.
+_MATH_HINT = re.compile(
+    r"\d|[+\-*/×÷=^%]|[零一二三四五六七八九十百千万亿两加减乘除]"
+    r"|\b(?:zero|one|two|three|four|five|six|seven|eight|nine|ten|hundred|thousand|million"
+    r"|plus|minus|times|divided|sum|difference|product|quotient|add|subtract|multiply|divide)\b",
+    re.IGNORECASE
+)
+
+
+def might_need_math(text: str) -> bool:
+    """Cheap check for whether a message could call for the math tools."""
+    return _MATH_HINT.search(text) is not None
+
 
 @tool
 def add(a: float, b: float) -> float:
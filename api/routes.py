@@ -11,6 +11,12 @@ import json
 import asyncio
 from pathlib import Path
 
+# Optional faster JSON encoding for SSE frames
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from agent.agent_factory import AgentFactory
 from utils.logger import setup_logger
 
@@ -40,6 +46,24 @@ agent = AgentFactory.create_agent('conversation', str(config_path))
 logger.info("Agent initialized successfully in API routes")
 
 
+def _encode_frame(chunk: Dict[str, Any]) -> bytes:
+    """
+    Serialize a stream chunk to a UTF-8 SSE frame, preferring orjson when it is installed.
+    Bytes are passed to the transport as-is, with no str-to-bytes re-encode.
+    """
+    if orjson is not None:
+        try:
+            return b"data: " + orjson.dumps(chunk) + b"\n\n"
+        except TypeError:
+            # orjson不支持的类型（如超大整数）回退到标准库
+            pass
+    return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+# The stream terminator never changes, so encode it once
+_STREAM_END_FRAME = f"data: {json.dumps({'type': 'stream_end'})}\n\n".encode("utf-8")
+
+
 class ChatRequest(BaseModel):
     """Request model for chat endpoint."""
     message: str
@@ -96,23 +120,20 @@ async def chat_stream(request: ChatRequest):
                 session_id=request.session_id
             ):
                 # Format as SSE
-                data = json.dumps(chunk, ensure_ascii=False)
-                yield f"data: {data}\n\n"
-                
-                # 强制刷新缓冲区，确保数据立即发送
-                await asyncio.sleep(0)  # 让出控制权，确保数据发送
+                # StreamingResponse awaits the transport send for every frame,
+                # so each chunk goes out without an explicit yield here
+                yield _encode_frame(chunk)
         
         except Exception as e:
             logger.error(f"Streaming error: {e}")
-            error_data = json.dumps({
+            yield _encode_frame({
                 "type": "error",
                 "content": f"Streaming error: {str(e)}"
             })
-            yield f"data: {error_data}\n\n"
         
         finally:
             # Send completion signal
-            yield f"data: {json.dumps({'type': 'stream_end'})}\n\n"
+            yield _STREAM_END_FRAME
     
     return StreamingResponse(
         generate_stream(),
@@ -142,7 +163,7 @@ async def chat_complete(request: ChatRequest):
     logger.info(f"Received complete chat request: {request.message[:100]}...")
     
     try:
-        response_content = ""
+        response_parts = []
         tool_calls = []
         session_id = request.session_id
         
@@ -151,14 +172,14 @@ async def chat_complete(request: ChatRequest):
             session_id=request.session_id
         ):
             if chunk["type"] == "message":
-                response_content += chunk["content"]
+                response_parts.append(chunk["content"])
             elif chunk["type"] == "tool_call":
                 tool_calls.append(chunk)
             elif chunk["type"] == "session_info":
                 session_id = chunk["session_id"]
         
         return ChatResponse(
-            response=response_content,
+            response="".join(response_parts),
             session_id=session_id,
             tool_calls=tool_calls
         )
@@ -212,7 +233,8 @@ async def get_session_info(session_id: str):
     Returns statistics and metadata about the session.
     """
     try:
-        info = agent.get_session_info(session_id)
+        # Session stats hit the database; keep them off the event loop
+        info = await asyncio.to_thread(agent.get_session_info, session_id)
         return {
             "session_id": session_id,
             **info
@@ -230,7 +252,7 @@ async def clear_session(session_id: str):
     This removes all chat history for the session.
     """
     try:
-        agent.clear_session(session_id)
+        await asyncio.to_thread(agent.clear_session, session_id)
         logger.info(f"Cleared session: {session_id}")
         return {
             "message": f"Session {session_id} cleared successfully",
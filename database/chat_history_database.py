@@ -18,11 +18,20 @@ class ChatHistoryDatabaseInterface(ABC):
         """Save a message to the database."""
         pass
     
+    def save_messages(self, session_id: str, messages: List[Dict[str, Any]]) -> None:
+        """Save several messages to the database. Implementations may batch the writes."""
+        for message in messages:
+            self.save_message(session_id, message)
+    
     @abstractmethod
     def get_chat_history(self, session_id: str) -> List[Dict[str, Any]]:
         """Get chat history for a session."""
         pass
     
+    def get_message_count(self, session_id: str) -> int:
+        """Get the number of stored messages for a session. Implementations may count without loading."""
+        return len(self.get_chat_history(session_id))
+    
     @abstractmethod
     def delete_session(self, session_id: str) -> None:
         """Delete a session and all its messages."""
@@ -6,12 +6,31 @@ import sqlite3
 import json
 import os
 
+# Optional faster JSON encoding/decoding for message metadata
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    orjson = None
+    _json_loads = json.loads
+
 from database.chat_history_database import ChatHistoryDatabaseInterface
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 
+def _json_dumps(value: Any) -> str:
+    """Encode metadata to a JSON string, preferring orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value).decode("utf-8")
+        except TypeError:
+            # orjson不支持的类型（如非字符串键）回退到标准库
+            pass
+    return json.dumps(value)
+
+
 class SQLiteChatHistoryDatabase(ChatHistoryDatabaseInterface):
     """SQLite implementation of the chat history database interface."""
     
@@ -47,7 +66,7 @@ class SQLiteChatHistoryDatabase(ChatHistoryDatabaseInterface):
         """Save a message to the database."""
         message_type = message.get("type", "unknown")
         content = message.get("content", "")
-        metadata = json.dumps(message.get("metadata", {}))
+        metadata = _json_dumps(message.get("metadata", {}))
         character_count = len(str(content))
         
         with sqlite3.connect(self.db_path) as conn:
@@ -61,6 +80,33 @@ class SQLiteChatHistoryDatabase(ChatHistoryDatabaseInterface):
         
         logger.debug(f"Saved message for session {session_id}: {message_type}")
     
+    def save_messages(self, session_id: str, messages: List[Dict[str, Any]]) -> None:
+        """Save several messages in a single transaction."""
+        if not messages:
+            return
+        
+        rows = [
+            (
+                session_id,
+                message.get("type", "unknown"),
+                message.get("content", ""),
+                _json_dumps(message.get("metadata", {})),
+                len(str(message.get("content", "")))
+            )
+            for message in messages
+        ]
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.executemany("""
+                INSERT INTO chat_messages 
+                (session_id, message_type, content, metadata, character_count)
+                VALUES (?, ?, ?, ?, ?)
+            """, rows)
+            conn.commit()
+        
+        logger.debug(f"Saved {len(rows)} messages for session {session_id}")
+    
     def get_chat_history(self, session_id: str) -> List[Dict[str, Any]]:
         """Get chat history for a session."""
         with sqlite3.connect(self.db_path) as conn:
@@ -79,7 +125,7 @@ class SQLiteChatHistoryDatabase(ChatHistoryDatabaseInterface):
                 message = {
                     "type": row["message_type"],
                     "content": row["content"],
-                    "metadata": json.loads(row["metadata"]) if row["metadata"] else {},
+                    "metadata": _json_loads(row["metadata"]) if row["metadata"] else {},
                     "timestamp": row["timestamp"],
                     "character_count": row["character_count"]
                 }
@@ -88,6 +134,19 @@ class SQLiteChatHistoryDatabase(ChatHistoryDatabaseInterface):
         logger.debug(f"Retrieved {len(messages)} messages for session {session_id}")
         return messages
     
+    def get_message_count(self, session_id: str) -> int:
+        """Get the number of stored messages for a session."""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT COUNT(*) 
+                FROM chat_messages 
+                WHERE session_id = ?
+            """, (session_id,))
+            count = cursor.fetchone()[0]
+        
+        return count
+    
     def delete_session(self, session_id: str) -> None:
         """Delete a session and all its messages."""
         with sqlite3.connect(self.db_path) as conn:
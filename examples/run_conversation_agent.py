@@ -26,7 +26,7 @@ project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 try:
-    from agent.builder import ConversationAgent
+    from agent.conversation_agent import ConversationAgent
     from utils.logger import setup_logger, get_logger
     from agent.models.loader import ModelLoader
 except ImportError as e:
@@ -93,9 +93,8 @@ class ConsoleConversationAgent:
             async for chunk in self.agent.chat_stream(message, self.session_id):
                 chunk_type = chunk.get("type", "")
                 
-                if chunk_type == "session_info":
-                    if chunk.get("was_compressed"):
-                        print("💾 注意: 对话历史已被压缩以节省上下文空间")
+                if chunk_type == "history_compressed":
+                    print("💾 注意: 对话历史已被压缩以节省上下文空间")
                 
                 elif chunk_type == "tool_call":
                     tool_name = chunk.get("name", "unknown")
@@ -55,6 +55,17 @@ def test_database():
         if messages and len(messages) > 0:
             print("✓ Database operations working")
             
+            # Test batched save
+            db.save_messages("test_session", [
+                {"type": "ai", "content": "Batch reply", "metadata": {}},
+                {"type": "tool_call", "content": "42", "metadata": {"tool_name": "add"}}
+            ])
+            batched = db.get_chat_history("test_session")
+            if [msg["type"] for msg in batched[-2:]] != ["ai", "tool_call"]:
+                print("✗ Database batch save failed")
+                return False
+            print("✓ Database batch save working")
+            
             # Clean up
             db.delete_session("test_session")
             print("✓ Database cleanup successful")
@@ -87,6 +98,127 @@ def test_tools():
         print(f"✗ Tools error: {e}")
         return False
 
+def test_confirmation_manager():
+    """Test tool confirmation bookkeeping stays bounded."""
+    print("\nTesting confirmation manager...")
+    
+    try:
+        import asyncio
+        from agent.confirmation.manager import ToolConfirmationManager
+        
+        manager = ToolConfirmationManager(default_timeout=5)
+        
+        async def confirm_many(count):
+            for i in range(count):
+                session_id = f"session_{i % 10}"
+                task = asyncio.create_task(
+                    manager.request_confirmation(session_id, "add", {"a": i, "b": 1}, "", {})
+                )
+                await asyncio.sleep(0)
+                assert manager.confirm_tool(session_id, True)
+                confirmed, _, error = await task
+                assert confirmed and error is None
+        
+        asyncio.run(confirm_many(1000))
+        
+        if manager._pending_requests or manager._session_index or manager._expiry_heap:
+            print(f"✗ Confirmation manager kept finished requests: {manager.get_statistics()}, "
+                  f"heap size {len(manager._expiry_heap)}")
+            return False
+        
+        print("✓ Confirmation manager working")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Confirmation manager error: {e}")
+        return False
+
+def test_tool_confirmation_gate():
+    """Test a tool waiting for confirmation does not run before it is answered."""
+    print("\nTesting tool confirmation gate...")
+    
+    try:
+        import asyncio
+        from langchain_core.language_models.chat_models import BaseChatModel
+        from langchain_core.messages import AIMessage, HumanMessage
+        from langchain_core.outputs import ChatGeneration, ChatResult
+        from langchain_core.tools import tool
+        from agent.code_agent import CodeAgent
+        
+        calls = []
+        
+        @tool
+        def traced_add(a: int, b: int) -> int:
+            """Add two numbers."""
+            calls.append((a, b))
+            return a + b
+        
+        class ScriptedLLM(BaseChatModel):
+            """Asks for one tool call, then answers."""
+            turns: int = 0
+            
+            @property
+            def _llm_type(self) -> str:
+                return "scripted"
+            
+            def bind_tools(self, tools, **kwargs):
+                return self
+            
+            def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+                self.turns += 1
+                if self.turns == 1:
+                    message = AIMessage(content="", tool_calls=[
+                        {"name": "traced_add", "args": {"a": 1, "b": 2}, "id": "call_1"}
+                    ])
+                else:
+                    message = AIMessage(content="1 + 2 = 3")
+                return ChatResult(generations=[ChatGeneration(message=message)])
+        
+        class ScriptedLoader:
+            def load_llm(self):
+                return ScriptedLLM()
+        
+        class TracedAgent(CodeAgent):
+            @classmethod
+            def _get_model_loader(cls, config_path):
+                return ScriptedLoader()
+            
+            def _get_tools(self):
+                return [traced_add]
+        
+        agent = TracedAgent("unused")
+        session_id = "confirmation_gate_test"
+        calls_before_answer = None
+        
+        async def answer():
+            nonlocal calls_before_answer
+            while not agent.confirmation_manager.has_pending_request(session_id):
+                await asyncio.sleep(0.01)
+            # Give a graph that runs ahead the chance to reach its tools node
+            await asyncio.sleep(0.2)
+            calls_before_answer = list(calls)
+            agent.confirm_tool_execution(session_id, True)
+        
+        async def run():
+            answering = asyncio.create_task(answer())
+            async for _ in agent._stream_graph_response([HumanMessage(content="add 1 and 2")], session_id):
+                pass
+            await answering
+        
+        asyncio.run(run())
+        
+        if calls_before_answer != [] or not calls:
+            print(f"✗ Tool ran before confirmation: calls before answer {calls_before_answer}, "
+                  f"all calls {calls}")
+            return False
+        
+        print("✓ Tool confirmation gate working")
+        return True
+    
+    except Exception as e:
+        print(f"✗ Tool confirmation gate error: {e}")
+        return False
+
 def test_logging():
     """Test logging system."""
     print("\nTesting logging...")
@@ -115,6 +247,8 @@ def main():
         test_imports,
         test_database,
         test_tools,
+        test_confirmation_manager,
+        test_tool_confirmation_gate,
         test_logging
     ]
     
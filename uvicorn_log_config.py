@@ -47,7 +47,7 @@ LOGGING_CONFIG = {
         "uvicorn.access": {"handlers": ["access"], "level": "INFO", "propagate": False},
         # 确保我们的应用日志能够正确输出
         "agent": {"handlers": ["app"], "level": "DEBUG", "propagate": False},
-        "agent.builder": {"handlers": ["app"], "level": "DEBUG", "propagate": False},
+        "agent.conversation_agent": {"handlers": ["app"], "level": "DEBUG", "propagate": False},
         "api": {"handlers": ["app"], "level": "DEBUG", "propagate": False},
         "api.routes": {"handlers": ["app"], "level": "DEBUG", "propagate": False},
         "utils": {"handlers": ["app"], "level": "DEBUG", "propagate": False},